@@ -21,7 +21,6 @@
 
 
 # TobiiGlassesTracker
-import copy
 import math
 import numpy as np
 
@@ -58,6 +57,13 @@ import socket
 import uuid
 import logging as log
 
+# monotonic clock for the logger's sampling deadlines; fall back to the wall
+# clock on Python versions that lack it
+try:
+	from time import monotonic
+except ImportError:
+	from time import time as monotonic
+
 import warnings
 warnings.filterwarnings("ignore", category=np.VisibleDeprecationWarning)
 
@@ -70,6 +76,24 @@ from tobiiglasses.tobiiglassescontroller import TobiiGlassesController
 # # # # #
 # functions
 
+def deg2pix(cmdist, angle, pixpercm):
+
+	"""Returns the value in pixels for given values (internal use)
+	
+	arguments
+	cmdist	-- distance to display in centimeters
+	angle		-- size of stimulus in visual angle
+	pixpercm	-- amount of pixels per centimeter for display
+	
+	returns
+	pixelsize	-- stimulus size in pixels (calculation based on size in
+			   visual angle on display with given properties)
+	"""
+
+	cmsize = math.tan(math.radians(angle)) * float(cmdist)
+	return cmsize * pixpercm
+
+
 def calculate_angular_velocity(gp3_samples, eye_samples):
 	""" Returns the angular velocity of eye movement
 
@@ -82,26 +106,185 @@ def calculate_angular_velocity(gp3_samples, eye_samples):
 	eye_samples			-- Eye position samples from tobii glasses 
 
 	returns
-	angular_velocity	-- Angular velocity as a float number
+	angular_velocity	-- Angular velocity in degrees per second as a
+					   float number
+	"""
+
+	gp3_first = gp3_samples[0]['gp3']
+	gp3_last = gp3_samples[-1]['gp3']
+	pc_first = eye_samples[0]['pc']
+	pc_last = eye_samples[-1]['pc']
+
+	return _angular_velocity(
+		gp3_first[0] - pc_first[0],
+		gp3_first[1] - pc_first[1],
+		gp3_first[2] - pc_first[2],
+		gp3_last[0] - pc_last[0],
+		gp3_last[1] - pc_last[1],
+		gp3_last[2] - pc_last[2],
+		gp3_last[0] - gp3_first[0],
+		gp3_last[1] - gp3_first[1],
+		gp3_last[2] - gp3_first[2],
+		# timestamps are in microseconds
+		(gp3_samples[-1]['ts'] - gp3_samples[0]['ts']) / 1000000.0)
+
+
+def _angular_velocity(ax, ay, az, bx, by, bz, cx, cy, cz, time_diff):
+
+	"""Scalar kernel for calculate_angular_velocity (for internal use)
+
+	Works on plain floats only, so no arrays are allocated for what are
+	just three 3D vectors per call.
+
+	arguments
+	ax, ay, az		-- vector from eye to first gaze 3d position
+	bx, by, bz		-- vector from eye to last gaze 3d position
+	cx, cy, cz		-- vector from first to last gaze 3d position
+	time_diff		-- time between first and last sample in seconds
+
+	returns
+	angular_velocity	-- Angular velocity as a float number; NaN when
+					   it is undefined (no time passed between the
+					   samples, or a gaze vector has zero length)
 	"""
 
-	a = np.array(gp3_samples[0]['gp3']) - np.array(eye_samples[0]['pc']) 
-	b = np.array(gp3_samples[-1]['gp3']) - np.array(eye_samples[-1]['pc'])
-	c = np.array(gp3_samples[-1]['gp3']) - np.array(gp3_samples[0]['gp3'])
+	# squared norm/magnitude of vectors; the law of cosines only needs a*b
+	# unsquared, so a single square root is enough
+	a2 = ax*ax + ay*ay + az*az
+	b2 = bx*bx + by*by + bz*bz
+	c2 = cx*cx + cy*cy + cz*cz
 
-	# convert to norm/magnitude of vectors
-	a = np.linalg.norm(a)
-	b = np.linalg.norm(b)
-	c = np.linalg.norm(c)
+	# no velocity; NaN compares False against any threshold, so neither a
+	# fixation start nor a fixation end is detected from it
+	if time_diff <= 0 or a2 * b2 == 0:
+		return float('nan')
+
+	# clamp to acos' domain, rounding can push it just outside [-1, 1]
+	cos_angle = (a2 + b2 - c2) / (2.0 * math.sqrt(a2 * b2))
+	cos_angle = min(1.0, max(-1.0, cos_angle))
 
 	# angle in degrees
-	angle = np.degrees(np.arccos((a**2 + b**2 - c**2) / (2*a*b)))
+	angle = math.degrees(math.acos(cos_angle))
+
+	return abs(angle / time_diff)
+
+
+def _column_medians(values):
+
+	"""Returns the median of every column of a 2D array, like
+	np.median(values, axis=0) (for internal use)
+
+	For an odd number of rows the median is a single row, which
+	np.partition selects without sorting; np.median is only used when the
+	two middle values have to be averaged.
+
+	arguments
+	values		-- 2D array, one row per sample
+
+	returns
+	medians		-- 1D array with the median of every column
+	"""
+
+	nrows = len(values)
+	if nrows % 2 == 0:
+		return np.median(values, axis=0)
+	mid = nrows // 2
+	return np.partition(values, mid, axis=0)[mid]
 
-	time_diff = gp3_samples[-1]['ts'] - gp3_samples[0]['ts']
 
-	return math.abs(angle / time_diff)
+# values of invalid samples (as returned by the sample getters when no data
+# is available), per sample type
+_INVALID_SAMPLES = {'gp': [-1,-1], 'gp3': [-1,-1,-1], 'pc': [-1,-1,-1]}
 
 
+# stands in for livedata values that are not available (yet)
+_NO_VALUES = (None, None, None)
+
+
+def _eye_log_fields(eye):
+
+	"""Returns the _LOG_FIELDS entry of the left or right eye (for internal
+	use)"""
+
+	statements = [
+		"%s = data.get('%s') or {}" % (eye, eye),
+		"%s_pc = %s.get('pc', {}).get('pc') or _NO_VALUES" % (eye, eye),
+		"%s_pd = %s.get('pd', {}).get('pd')" % (eye, eye),
+		"%s_gd = %s.get('gd', {}).get('gd') or _NO_VALUES" % (eye, eye),
+		]
+	columns = [
+		"%s_pc[0]" % eye, "%s_pc[1]" % eye, "%s_pc[2]" % eye,
+		"%s_pd" % eye,
+		"%s_gd[0]" % eye, "%s_gd[1]" % eye, "%s_gd[2]" % eye,
+		]
+	return (eye, statements, columns)
+
+
+# logging keys with the source of the statements that look up their
+# livedata values and of the expressions for their log file columns, in
+# column order; see _make_log_row
+_LOG_FIELDS = (
+	("mems", [
+		"mems = data.get('mems') or {}",
+		"ac = mems.get('ac', {}).get('ac') or _NO_VALUES",
+		"gy = mems.get('gy', {}).get('gy') or _NO_VALUES",
+		], ["ac[0]", "ac[1]", "ac[2]", "gy[0]", "gy[1]", "gy[2]"]),
+	("gp", [
+		"gp = (data.get('gp') or {}).get('gp') or _NO_VALUES",
+		], ["gp[0]", "gp[1]"]),
+	("gp3", [
+		"gp3 = (data.get('gp3') or {}).get('gp3') or _NO_VALUES",
+		], ["gp3[0]", "gp3[1]", "gp3[2]"]),
+	_eye_log_fields("left_eye"),
+	_eye_log_fields("right_eye"),
+	)
+
+
+def _make_log_row(keys, ntriggers):
+
+	"""Returns a function that formats a log row (for internal use)
+
+	The function is generated for the given logging keys, so it only
+	contains the lookups for those keys and formats the whole row with a
+	single %-format. It is called as log_row(data, triggers), with the
+	livedata dictionary and a sequence of ntriggers trigger values.
+
+	arguments
+	keys		-- logging keys to include in the row
+	ntriggers	-- number of trigger values at the end of the row
+
+	returns
+	log_row	-- the row formatting function
+	"""
+
+	lines = ["def log_row(data, triggers):"]
+	columns = []
+	for key, statements, values in _LOG_FIELDS:
+		if key in keys:
+			lines.extend(["\t" + statement for statement in statements])
+			columns.extend(values)
+	columns.extend(["triggers[%d]" % i for i in range(ntriggers)])
+
+	template = "; ".join(["%s"] * len(columns))
+	lines.append("\treturn %r %% (%s)" % (template, 
+		"".join([column + ", " for column in columns])))
+
+	namespace = {'_NO_VALUES': _NO_VALUES}
+	exec(compile("\n".join(lines) + "\n", "<log row>", "exec"), namespace)
+	return namespace['log_row']
+
+
+# log file column headers for each logging key
+_KEY_HEADERS = {
+	"mems": "ac_x [m/s^2]; ac_y [m/s^2]; ac_z [m/s^2]; gy_x [°/s]; gy_y [°/s]; gy_z [°/s]",
+	"gp": "gp_x; gp_y",
+	"gp3": "gp3_x [mm]; gp3_y [mm]; gp3_z [mm]",
+	"left_eye": "left_pc_x [mm]; left_pc_y [mm]; left_pc_z [mm]; left_pd [mm]; left_gd_x; left_gd_y; left_gd_z",
+	"right_eye": "right_pc_x [mm]; right_pc_y [mm]; right_pc_z [mm]; right_pd [mm]; right_gd_x; right_gd_y; right_gd_z",
+	}
+
+# logging keys in log file column order
+_LOG_KEYS = ("mems", "gp", "gp3", "left_eye", "right_eye")
 
 
 # # # # #
@@ -131,7 +314,7 @@ class TobiiGlassesTracker(BaseEyeTracker):
 		# try to copy docstrings (but ignore it if it fails, as we do
 		# not need it for actual functioning of the code)
 		try:
-			copy_docstr(BaseEyeTracker, TobiiProGlassesTracker)
+			copy_docstr(BaseEyeTracker, TobiiGlassesTracker)
 		except:
 			# we're not even going to show a warning, since the copied
 			# docstring is useful for code editors; these load the docs
@@ -146,7 +329,7 @@ class TobiiGlassesTracker(BaseEyeTracker):
 		self.screensize = settings.SCREENSIZE	# display size in cm
 		self.screendist = settings.SCREENDIST	# distance between participant
 												# and screen in cm
-		self.pixpercm = (self.dispsize[0]/float(self.screensize[0]) + \ 
+		self.pixpercm = (self.dispsize[0]/float(self.screensize[0]) + \
 						self.dispsize[1]/float(self.screensize[1])) / 2.0
 		self.kb = Keyboard(keylist=['space', 'escape', 'q'], timeout=1)
 		self.errorbeep = Sound(osc='saw',freq=100, length=100)
@@ -198,10 +381,28 @@ class TobiiGlassesTracker(BaseEyeTracker):
 							 # higher is more conservative and will result in 
 							 # only larger saccades to be detected)
 
+		# thresholds in pixels (degrees to pixels); the glasses report gaze
+		# positions normalized to [0, 1], so the event detection scales
+		# gaze position differences to the display size before comparing
+		# them with these thresholds; the squared fixation threshold is
+		# compared against squared distances in the fixation detection
+		# loops, and the saccade detection multiplies by the reciprocal
+		# noise thresholds instead of dividing
+		self.pxfixtresh = deg2pix(self.screendist, self.fixtresh, self.pixpercm)
+		self.pxfixtresh_sq = self.pxfixtresh**2
+		self.pxspdtresh = deg2pix(self.screendist, self.spdtresh/1000.0, self.pixpercm) # in pixels per millisecond
+		self.pxacctresh = deg2pix(self.screendist, self.accthresh/1000.0, self.pixpercm) # in pixels per millisecond**2
+		self.pxdsttresh = (1.0, 1.0)	# RMS noise in pixels; the glasses'
+										# calibration does not measure it
+		self.pxdsttresh_inv = (1.0 / self.pxdsttresh[0],
+							1.0 / self.pxdsttresh[1])
+
 
 		self.tobiiglasses = TobiiGlassesController(udpport, address)
 
-		self.triggers_values = {}
+		self._trigger_idx = {}		# column of each trigger in _trigger_vals
+		self._trigger_vals = []		# latest value of each trigger
+		self._log_row_cache = {}	# log row functions per keys/triggers
 
 		self.logging = False
 		self.current_recording_id = None
@@ -209,15 +410,11 @@ class TobiiGlassesTracker(BaseEyeTracker):
 		self.current_project_id = None
 
 		# Fixation filer parameters
-		self.init_run = True			# Used for initial fixation run to 
-										# collect samples to fill window
-
 		self.num_fixation_samples = 3	# Default = 3. Can be increased to 
 										# create a bigger window
 
-		self.gaze_samples = []			# gaze position samples
-		self.gp3_samples = []			# 3d gaze position samples
-		self.eye_samples = []			# 3d eye position samples
+		# sample window, see _reset_fixation_window
+		self._reset_fixation_window()
 
 		self.velocity_threshold = 70	# Degrees/second. 70 retains good 
 										# accuracy for saccades and fixations
@@ -233,146 +430,55 @@ class TobiiGlassesTracker(BaseEyeTracker):
 
 		self.close()
 
-	def __get_log_row__(self, keys, triggers):
-
-		row = ""
-		ac = [None, None, None]
-		gy = [None, None, None]
-		if "mems" in keys:
-
-			try:
-				for i in range(0,3):
-					ac[i] = self.tobiiglasses.data['mems']['ac']['ac'][i]
-			except:
-				pass
-
-			try:
-				for i in range(0,3):
-					gy[i] = self.tobiiglasses.data['mems']['gy']['gy'][i]
-			except:
-				pass
-
-			row += ("%s; %s; %s; %s; %s; %s; " % (ac[0], ac[1], ac[2], gy[0], gy[1], gy[2]))
-
-
-		gp = [None, None]
-		if "gp" in keys:
-
-			try:
-				for i in range(0,2):
-					gp[i] = self.tobiiglasses.data['gp']['gp'][i]
-			except:
-				pass
-
-			row += ("%s; %s; " % (gp[0], gp[1]))
-
-
-		gp3 = [None, None, None]
-		if "gp3" in keys:
-
-			try:
-				for i in range(0,3):
-					gp3[i] = self.tobiiglasses.data['gp3']['gp3'][i]
-			except:
-				pass
-
-			row += ("%s; %s; %s; " % (gp3[0], gp3[1], gp3[2]))
-
-
-		pc = [None, None, None]
-		pd = None
-		gd = [None, None, None]
-		if "left_eye" in keys:
-
-			try:
-				for i in range(0,3):
-					pc[i] = self.tobiiglasses.data['left_eye']['pc']['pc'][i]
-			except:
-				pass
-
-			try:
-				pd = self.tobiiglasses.data['left_eye']['pd']['pd']
-			except:
-				pass
-
-			try:
-				for i in range(0,3):
-					gd[i] = self.tobiiglasses.data['left_eye']['gd']['gd'][i]
-			except:
-				pass
-
-
-			row += ("%s; %s; %s; %s; %s; %s; %s; " % (pc[0], pc[1], pc[2], pd, gd[0], gd[1], gd[2]))
-
-		pc = [None, None, None]
-		pd = None
-		gd = [None, None, None]
-		if "right_eye" in keys:
-
-			try:
-				for i in range(0,3):
-					pc[i] = self.tobiiglasses.data['right_eye']['pc']['pc'][i]
-			except:
-				pass
-
-			try:
-				pd = self.tobiiglasses.data['right_eye']['pd']['pd']
-			except:
-				pass
-
-			try:
-				for i in range(0,3):
-					gd[i] = self.tobiiglasses.data['right_eye']['gd']['gd'][i]
-			except:
-				pass
-
-			row += ("%s; %s; %s; %s; %s; %s; %s; " % (pc[0], pc[1], pc[2], pd, gd[0], gd[1], gd[2]))
-
-		if len(triggers) > 0:
-			for trigger in triggers:
-				row += ("%s; " % self.triggers_values[trigger])
+	def __get_log_row_function__(self, keys, triggers):
 
-		row = row[:-2]
-		return row
+		cache_key = (frozenset(keys), len(triggers))
+		try:
+			return self._log_row_cache[cache_key]
+		except KeyError:
+			log_row = _make_log_row(keys, len(triggers))
+			self._log_row_cache[cache_key] = log_row
+			return log_row
 
 	def __get_log_header__(self, keys, triggers):
 
-		header = "ts; "
-
-		if "mems" in keys:
-			header+="ac_x [m/s^2]; ac_y [m/s^2]; ac_z [m/s^2]; gy_x [°/s]; gy_y [°/s]; gy_z [°/s]; "
-		if "gp" in keys:
-			header+="gp_x; gp_y; "
-		if "gp3" in keys:
-			header+="gp3_x [mm]; gp3_y [mm]; gp3_z [mm]; "
-		if "left_eye" in keys:
-			header+="left_pc_x [mm]; left_pc_y [mm]; left_pc_z [mm]; left_pd [mm]; left_gd_x; left_gd_y; left_gd_z; "
-		if "left_eye" in keys:
-			header+="right_pc_x [mm]; right_pc_y [mm]; right_pc_z [mm]; right_pd [mm]; right_gd_x; right_gd_y; right_gd_z; "
-
-		if len(triggers) > 0:
-			for trigger in triggers:
-				header+=trigger + "; "
-				self.triggers_values[trigger] = None
+		parts = ["ts"]
+		parts.extend([_KEY_HEADERS[key] for key in _LOG_KEYS if key in keys])
+		parts.extend(triggers)
 
-		header = header[:-2]
-		return header
+		return "; ".join(parts)
 
 
 	def __data_logger__(self, logfile, frequency, keys, triggers, time_offset):
 
+		log_row = self._log_row
+		# updated in place by self.trigger
+		trigger_vals = self._trigger_vals
+
 		with open(logfile, 'a') as f:
 
 			header = self.__get_log_header__(keys, triggers)
 			f.write(header + "\n")
 
+			time_period = 1.0/float(frequency)
+			nrows = 0
+			flush_every = max(1, int(frequency))
+
+			# rows are scheduled on fixed deadlines, so the time spent
+			# writing a row and sleep jitter do not add up over time
+			deadline = monotonic()
+
 			while self.logging:
 
-				row = self.__get_log_row__(keys, triggers)
-				f.write("%s; %s \n" % (time_offset, row))
-				time_period = float(1.0/float(frequency))
-				time_offset += int(time_period*1000)
-				time.sleep(time_period)
+				row = log_row(self.tobiiglasses.data, trigger_vals)
+				ts = time_offset + int(nrows*time_period*1000)
+				f.write("%s; %s \n" % (ts, row))
+				# rows are buffered; flush about once per second
+				nrows += 1
+				if nrows % flush_every == 0:
+					f.flush()
+				deadline += time_period
+				time.sleep(max(0.0, deadline - monotonic()))
 
 
 	def start_capturing(self):
@@ -457,8 +563,38 @@ class TobiiGlassesTracker(BaseEyeTracker):
 
 	def start_logging(self, logfile, frequency, keys = ["mems", "gp", "gp3", "left_eye", "right_eye"], triggers = [], time_offset=0):
 
+		"""Starts logging livedata to a file at a fixed frequency
+
+		Logging runs in a daemon thread of this process: the livedata is
+		received by the TobiiGlassesController's streaming thread in this
+		process and trigger values can be any object, so a logger process
+		would need every sample and trigger copied over to it first. The
+		logger thread spends most of its time sleeping; each row is a
+		single generated formatting call (see _make_log_row) and rows are
+		written through a buffered file.
+
+		arguments
+		logfile		-- path of the file the rows are appended to
+		frequency		-- number of rows per second
+
+		keyword arguments
+		keys			-- livedata to log, any of "mems", "gp", "gp3",
+					   "left_eye" and "right_eye" (default = all)
+		triggers		-- names of trigger columns, see self.trigger
+					   (default = [])
+		time_offset	-- timestamp of the first row in milliseconds
+					   (default = 0)
+
+		returns
+		logging		-- True if the tracker is logging
+		"""
+
 		if not self.logging:
-			self.logger = threading.Timer(0, self.__data_logger__, [logfile, frequency, keys, triggers, time_offset])
+			self._log_row = self.__get_log_row_function__(keys, triggers)
+			self._trigger_idx = dict((trigger, i) for i, trigger in enumerate(triggers))
+			self._trigger_vals = [None] * len(triggers)
+			self.logger = threading.Thread(target=self.__data_logger__, args=[logfile, frequency, keys, triggers, time_offset])
+			self.logger.daemon = True
 			self.logging = True
 			self.logger.start()
 			log.debug("Start logging selected data in file " + logfile + " ...")
@@ -471,7 +607,7 @@ class TobiiGlassesTracker(BaseEyeTracker):
 	def trigger(self, trigger_key, trigger_value):
 
 		try:
-			self.triggers_values[trigger_key] = trigger_value
+			self._trigger_vals[self._trigger_idx[trigger_key]] = trigger_value
 			log.debug("Trigger received! Key: " + trigger_key + " Value: " + trigger_value)
 		except:
 			pass
@@ -677,47 +813,10 @@ class TobiiGlassesTracker(BaseEyeTracker):
 
 		"""
 		if self.tobiiglasses.is_streaming():
-			if self.eye_used == 0:
-				data = self.get_lefteyedata
-				try:
-					return data['pc']
-				except IndexError:
-					log.error("No eye position data available")
-					data_dict = {'pc': [-1,-1,-1], 'ts': -1, 'gidx': -1}
-					return data_dict
-
-			elif self.eye_used == 1:
-				data = self.get_righteyedata
-				try:
-					return data['pc']
-				except IndexError:
-					log.error("No eye position data available")
-					data_dict = {'pc': [-1,-1,-1], 'ts': -1, 'gidx': -1}
-					return data_dict
-
-			elif self.eye_used == 2:
-				data_left = self.get_lefteyedata
-				data_right = self.get_righteyedata
-				try:
-					if data_left['pc']['gidx'] != data_right['pc']['gidx']:
-						# we got eye positions for different events
-						data_dict = {'pc': [-1,-1,-1], 'ts': -1, 'gidx': -1}
-						return data_dict
-
-					# data okay, continue
-					eye_position = np.average([data_left['pc']['pc'], \
-											data_right['pc']['pc']], axis=0)
-					ts_avg = (data_left['pc']['ts'] + data_right['pc']['ts'])/2
-					data_dict = {'pc': list(eye_position), 
-								'ts': ts_avg,
-								'gidx': data_left['pc']['gidx']}
-					return data_dict
-				except IndexError:
-					log.error("No eye position data available")
-					data_dict = {'pc': [-1,-1,-1], 
-								'ts': -1, 
-								'gidx': -1}
-					return data_dict
+			eye_position = self._eye_position_from(self.get_data())
+			if eye_position['pc'] == _INVALID_SAMPLES['pc']:
+				log.error("No eye position data available")
+			return eye_position
 
 		else:
 			log.error("The eye-tracker is not in capturing mode.")
@@ -738,25 +837,27 @@ class TobiiGlassesTracker(BaseEyeTracker):
 		"""
 
 		if self.tobiiglasses.is_streaming():
-			ldata = self.get_lefteyedata()
-			rdata = self.get_righteyedata()
-			try:
-				if ldata['pd']['gidx'] == rdata['pd']['gidx']:
-					ts_avg = (ldata['pd']['ts'] + rdata['pd']['ts']) / 2
-
-					data_dict = {'left': ldata['pd']['pd'], 
-								'right': rdata['pd']['pd'],
-								'ts': ts_avg,
-								'gidx': ldata['pd']['gidx']}
-			except IndexError:
-				log.error("No gaze 3d position data available.")
-
-				data_dict = {'left': -1, 
-							'right': -1,
-							'ts': -1,
-							'gidx': -1}
-			finally:
-				return data_dict
+			ldata = self.get_lefteyedata().get('pd') or {}
+			rdata = self.get_righteyedata().get('pd') or {}
+			if 'pd' not in ldata or 'pd' not in rdata:
+				log.error("No pupil diameter data available.")
+				return {'left': -1, 
+						'right': -1,
+						'ts': -1,
+						'gidx': -1}
+
+			if ldata['gidx'] != rdata['gidx']:
+				# we got pupil diameters for different events
+				return {'left': -1, 
+						'right': -1,
+						'ts': -1,
+						'gidx': -1}
+
+			ts_avg = (ldata['ts'] + rdata['ts']) / 2
+			return {'left': ldata['pd'], 
+					'right': rdata['pd'],
+					'ts': ts_avg,
+					'gidx': ldata['gidx']}
 		else:
 			log.error("The eye-tracker is not in capturing mode.")
 
@@ -775,18 +876,10 @@ class TobiiGlassesTracker(BaseEyeTracker):
 		"""
 
 		if self.tobiiglasses.is_streaming():
-			data = self.tobiiglasses.get_gp()
-			try:
-				data_dict = {'gp': data['gp'], 
-							'ts': data['ts'],
-							'gidx': data['gidx']}
-			except IndexError:
+			sample = self._sample_from(self.get_data())
+			if sample['gp'] == _INVALID_SAMPLES['gp']:
 				log.error("No gaze position data available.")
-				data_dict = {'gp': [-1,-1], 
-							'ts': -1,
-							'gidx': -1}
-			finally:
-				return data_dict
+			return sample
 		else:
 			log.error("The eye-tracker is not in capturing mode.")
 
@@ -805,21 +898,112 @@ class TobiiGlassesTracker(BaseEyeTracker):
 		"""
 
 		if self.tobiiglasses.is_streaming():
-			data = self.tobiiglasses.get_gp3()
-			try:
-				data_dict = {'gp3': data['gp3'], 
-							'ts': data['ts'],
-							'gidx': data['gidx']}
-			except IndexError:
+			sample = self._sample3D_from(self.get_data())
+			if sample['gp3'] == _INVALID_SAMPLES['gp3']:
 				log.error("No gaze 3d position data available.")
-				data_dict = {'gp3': [-1,-1,-1], 
-							'ts': -1,
-							'gidx': -1}
-			finally:
-				return data_dict
+			return sample
 		else:
 			log.error("The eye-tracker is not in capturing mode.")
-		
+
+
+	def _snapshot(self):
+
+		"""Returns a snapshot of the livedata of the glasses, so that the
+		gaze position, gaze 3d position and eye data are read from the same
+		moment, without going through the controller and its capture check
+		for each of them (for internal use)
+
+		The controller replaces the data of a stream with a new dictionary
+		rather than changing it, so copying the livedata dictionary and the
+		per-eye dictionaries is enough to keep later updates out.
+
+		arguments
+		None
+
+		returns
+		data		-- a copy of the livedata dictionary, or None when the
+					   eye-tracker is not in capturing mode
+		"""
+
+		if self.tobiiglasses.is_streaming():
+			data = dict(self.tobiiglasses.data)
+			data['left_eye'] = dict(data['left_eye'])
+			data['right_eye'] = dict(data['right_eye'])
+			return data
+		else:
+			log.error("The eye-tracker is not in capturing mode.")
+
+
+	def _eye_position_from(self, data):
+
+		"""Returns the eye position in the livedata data, see
+		eye_position (for internal use)"""
+
+		if self.eye_used == 0:
+			pc = data['left_eye'].get('pc') or {}
+			if 'pc' not in pc:
+				return {'pc': [-1,-1,-1], 'ts': -1, 'gidx': -1}
+			return pc
+
+		elif self.eye_used == 1:
+			pc = data['right_eye'].get('pc') or {}
+			if 'pc' not in pc:
+				return {'pc': [-1,-1,-1], 'ts': -1, 'gidx': -1}
+			return pc
+
+		elif self.eye_used == 2:
+			data_left = data['left_eye'].get('pc') or {}
+			data_right = data['right_eye'].get('pc') or {}
+			if 'pc' not in data_left or 'pc' not in data_right:
+				return {'pc': [-1,-1,-1], 'ts': -1, 'gidx': -1}
+
+			if data_left['gidx'] != data_right['gidx']:
+				# we got eye positions for different events
+				return {'pc': [-1,-1,-1], 'ts': -1, 'gidx': -1}
+
+			# data okay, continue
+			pc_left = data_left['pc']
+			pc_right = data_right['pc']
+			eye_position = [(pc_left[0] + pc_right[0]) * 0.5,
+							(pc_left[1] + pc_right[1]) * 0.5,
+							(pc_left[2] + pc_right[2]) * 0.5]
+			ts_avg = (data_left['ts'] + data_right['ts'])/2
+			return {'pc': eye_position, 
+					'ts': ts_avg,
+					'gidx': data_left['gidx']}
+
+
+	def _sample_from(self, data):
+
+		"""Returns the gaze position in the livedata data, see sample
+		(for internal use)"""
+
+		gp = data['gp'] or {}
+		if 'gp' not in gp:
+			return {'gp': [-1,-1], 
+					'ts': -1,
+					'gidx': -1}
+
+		return {'gp': gp['gp'], 
+				'ts': gp['ts'],
+				'gidx': gp['gidx']}
+
+
+	def _sample3D_from(self, data):
+
+		"""Returns the gaze 3d position in the livedata data, see sample3D
+		(for internal use)"""
+
+		gp3 = data['gp3'] or {}
+		if 'gp3' not in gp3:
+			return {'gp3': [-1,-1,-1], 
+					'ts': -1,
+					'gidx': -1}
+
+		return {'gp3': gp3['gp3'], 
+				'ts': gp3['ts'],
+				'gidx': gp3['gidx']}
+
 
 
 	def send_command(self, cmd):
@@ -1062,110 +1246,88 @@ class TobiiGlassesTracker(BaseEyeTracker):
 			# function assumes a 'fixation' has started when gaze position
 			# remains reasonably stable for self.fixtimetresh
 		
+			# local aliases, save attribute lookups per sample
+			get_data = self.get_data
+			sample_from = self._sample_from
+			is_valid = self.is_valid_sample
+			get_time = clock.get_time
+			fixtresh_sq = self.pxfixtresh_sq
+			# gaze positions are normalized, the threshold is in pixels
+			dispw, disph = self.dispsize
+			fixtimetresh = self.fixtimetresh
+
 			# get starting position
-			spos = self.sample()
-			while not self.is_valid_sample(spos, 'gp'):
-				spos = self.sample()
-		
+			spos = sample_from(get_data())
+			while not is_valid(spos, 'gp'):
+				spos = sample_from(get_data())
+
+			# starting position as plain numbers, so the loop below does
+			# not index into the starting sample for every new sample
+			sx, sy = spos['gp']
+
 			# get starting time
-			t0 = clock.get_time()
+			t0 = get_time()
 
 			# wait for reasonably stable position
 			moving = True
 			while moving:
 				# get new sample
-				npos = self.sample()
+				npos = sample_from(get_data())
 				# check if sample is valid
-				if self.is_valid_sample(npos, 'gp'):
+				if is_valid(npos, 'gp'):
 					# check if new sample is too far from starting position
-					if (npos['gp'][0]-spos['gp'][0])**2 + \
-						(npos['gp'][1]-spos['gp'][1])**2 > \
-						self.pxfixtresh**2:
-						# if not, reset starting position and time
-						spos = copy.copy(npos)
-						t0 = clock.get_time()
+					nx, ny = npos['gp']
+					dx = (nx - sx) * dispw
+					dy = (ny - sy) * disph
+					if dx*dx + dy*dy > fixtresh_sq:
+						# if not, reset starting position and time (every
+						# sample is a new dictionary, so no copy is needed)
+						spos = npos
+						sx, sy = nx, ny
+						t0 = get_time()
 					# if new sample is close to starting sample
 					else:
 						# get timestamp
-						t1 = clock.get_time()
+						t1 = get_time()
 						# check if fixation time threshold has been surpassed
-						if t1 - t0 >= self.fixtimetresh:
+						if t1 - t0 >= fixtimetresh:
 							# return time and starting position
 							return {'ts': t0, 'spos': spos}
 		# Run experimental fixation detection
 		else:
+			# (re)allocate the window if num_fixation_samples was changed
+			num_samples = self.num_fixation_samples
+			if len(self._gp_ring) != num_samples:
+				self._reset_fixation_window()
+
+			# local aliases, save attribute lookups per sample (the window
+			# is filled in place, so the ring buffers stay the same objects)
+			pump_samples = self._pump_samples
+			window_same_event = self._window_same_event
+			window_angular_velocity = self._window_angular_velocity
+			velocity_threshold = self.velocity_threshold
+
 			# Loop until fixation found
 			while True:
-				if self.init_run:
-					# Loop until we got a full window of valid samples.
-					while len(self.gaze_samples) < 3 and \
-						len(self.gp3_samples) < 3 and \ 
-						len(self.eye_samples) < 3:
-
-						# If first time running, get inital samples to fill the
-						# window.
-						self.init_run = False
-						gaze_pos = self.sample()
-						spos = self.sample3D()
-						eye_position = self.eye_position()
-
-						while not self.is_valid_sample(gaze_pos, 'gp') and \
-							not self.is_valid_sample(spos, 'gp3') and\
-							not self.is_valid_sample(eye_position, 'pc'):
-							# Retry fetching valid samples
-							gaze_pos = self.sample()
-							spos = self.sample3D()
-							eye_position = self.eye_position()
-
-					
-						self.gaze_samples.append(gaze_pos)
-						self.gp3_samples.append(spos)
-						self.eye_samples.append(eye_position)
-					
-				else:
-					# remove oldest sample
-					self.gaze_samples = self.gaze_samples[1:]
-					self.gp3_samples = self.gp3_samples[1:]
-					self.eye_samples = self.eye_samples[1:]
-
-					# Fetch new samples
-					gaze_pos = self.sample()
-					spos = self.sample3D()
-					eye_position = self.eye_position()
-
-					while not self.is_valid_sample(gaze_pos, 'gp') and \
-						not self.is_valid_sample(spos, 'gp3') and \
-						not self.is_valid_sample(eye_position, 'pc'):
-						# Retry fetching valid samples
-						gaze_pos = self.sample()
-						spos = self.sample3D()
-						eye_position = self.eye_position()
-
-
-					self.gaze_samples.append(gaze_pos)
-					self.gp3_samples.append(spos)
-					self.eye_samples.append(eye_position)
-			
+				# Fetch new samples; the first run keeps fetching until the
+				# window is filled
+				pump_samples()
+				if self._nsamples < num_samples:
+					continue
+
 				# make sure that all samples are for the same event
-				if is_same_event(self.gaze_samples, 
-								self.gp3_samples, 
-								self.eye_samples):
+				if window_same_event():
 					# TODO: Use mems data to correct the angle that the eye(s)
 					# have actually moved before calculating the angular 
 					# velocity
-					ang_vel = self.calculate_angular_velocity(self.gp3_samples, 
-															self.eye_samples)
-					if ang_vel < self.velocity_threshold:
+					ang_vel = window_angular_velocity()
+					if ang_vel < velocity_threshold:
 						# Take the median value of window values. Smooths out the
 						# gaze position
-						gps_x = [sample['gp'][0] for sample in self.gaze_samples]
-						gps_y = [sample['gp'][1] for sample in self.gaze_samples]
-						gp3s_x = [sample['gp3'][0] for sample in self.gp3_samples]
-						gp3s_y = [sample['gp3'][1] for sample in self.gp3_samples]
-						gp_median = [np.median(gps_x), np.median(gps_y)]
-						gp3_median = [np.median(gp3s_x), np.median(gp3s_y)]
-
-						return {'ts': self.gaze_samples[1]['ts'],
+						gp_median = _column_medians(self._gp_ring).tolist()
+						gp3_median = _column_medians(self._gp3_ring[:,:2]).tolist()
+
+						return {'ts': int(self._ts_ring[0, self._window_row(1)]),
 								'gaze_pos': gp_median, 
 								'gp3': gp3_median}
 
@@ -1217,16 +1379,29 @@ class TobiiGlassesTracker(BaseEyeTracker):
 			stime = data['ts']
 			spos = data['spos']
 
+			# local aliases, save attribute lookups per sample
+			get_data = self.get_data
+			sample_from = self._sample_from
+			is_valid = self.is_valid_sample
+			fixtresh_sq = self.pxfixtresh_sq
+			# gaze positions are normalized, the threshold is in pixels
+			dispw, disph = self.dispsize
+
+			# starting position as plain numbers; it does not change
+			# while waiting
+			sx, sy = spos['gp']
+
 			# loop until fixation has ended
 			while True:
 				# get new sample
-				npos = self.sample() # get newest sample
+				npos = sample_from(get_data()) # get newest sample
 				# check if sample is valid
-				if self.is_valid_sample(npos, 'gp'):
+				if is_valid(npos, 'gp'):
 					# check if sample deviates to much from starting position
-					if (npos['gp'][0]-spos['gp'][0])**2 + \
-						(npos['gp'][1]-spos['gp'][1])**2 > \
-						self.pxfixtresh**2: # Pythagoras
+					nx, ny = npos['gp']
+					dx = (nx - sx) * dispw
+					dy = (ny - sy) * disph
+					if dx*dx + dy*dy > fixtresh_sq: # Pythagoras
 						# break loop if deviation is too high
 						break
 
@@ -1239,50 +1414,106 @@ class TobiiGlassesTracker(BaseEyeTracker):
 			stime = data['ts']
 			gaze_pos = data['gaze_pos']
 			gp3_pos = data['gp3']
+
+			# local aliases, save attribute lookups per sample
+			pump_samples = self._pump_samples
+			window_same_event = self._window_same_event
+			window_angular_velocity = self._window_angular_velocity
+			window_row = self._window_row
+			velocity_threshold = self.velocity_threshold
+			fixtimetresh = self.fixtimetresh
+			ts_ring = self._ts_ring
 			
 			# loop until fixation has ended
 			while True:
-				# remove oldest sample
-				self.gaze_samples = self.gaze_samples[1:]
-				self.gp3_samples = self.gp3_samples[1:]
-				self.eye_samples = self.eye_samples[1:]
-
-				# Fetch new samples
-				gaze_pos = self.sample()
-				spos = self.sample3D()
-				eye_position = self.eye_position()
-
-				while not self.is_valid_sample(gaze_pos, 'gp') and \
-					not self.is_valid_sample(spos, 'gp3') and \
-					not self.is_valid_sample(eye_position, 'pc'):
-					# Retry fetching valid samples
-					gaze_pos = self.sample()
-					spos = self.sample3D()
-					eye_position = self.eye_position()
-
-
-				self.gaze_samples.append(gaze_pos)
-				self.gp3_samples.append(spos)
-				self.eye_samples.append(eye_position)
+				# Fetch new samples (overwrites the oldest sample)
+				gaze_pos, spos, eye_position = pump_samples()
 			
 				# make sure that all samples are for the same event
-				if is_same_event(self.gaze_samples, 
-								self.gp3_samples, 
-								self.eye_samples):
+				if window_same_event():
 					# TODO: Use mems data to correct the angle that the eye(s)
 					# have actually moved before calculating the angular 
 					# velocity
-					ang_vel = self.calculate_angular_velocity(self.gp3_samples, 
-															self.eye_samples)
-					fixation_time = self.gaze_samples[1]['ts'] - stime
-					if ang_vel > self.velocity_threshold and \
-						fixation_time > self.fixtimetresh: 
+					ang_vel = window_angular_velocity()
+					# timestamps are in microseconds, fixtimetresh in
+					# milliseconds
+					fixation_time = (int(ts_ring[0, window_row(1)]) - stime) / 1000.0
+					if ang_vel > velocity_threshold and \
+						fixation_time > fixtimetresh: 
 
 						return {'fixation_time': fixation_time,
 								'gaze_pos': gaze_pos, 
 								'gp3': gp3_pos}
 
 
+	def detect_fixations(self, gp3_samples, eye_samples):
+
+		"""Detects the fixations in a recorded sequence of samples, in a
+		single pass over all of them
+
+		This is the offline counterpart of the experimental fixation
+		detection: the angular velocity between every two consecutive
+		samples is computed as in calculate_angular_velocity, and runs of
+		samples in which it stays below velocity_threshold are classified
+		as fixations.
+
+		arguments
+		gp3_samples		-- gaze 3d position samples
+		eye_samples		-- eye position samples, one for every gaze 3d
+						   position sample
+
+		returns
+		fixations		-- a list of (start, end) tuples with the indices of
+						   the first and last sample of every fixation
+		"""
+
+		# a velocity needs at least two samples
+		if len(gp3_samples) < 2:
+			return []
+
+		gp3 = np.array([sample['gp3'] for sample in gp3_samples], dtype=float)
+		pc = np.array([sample['pc'] for sample in eye_samples], dtype=float)
+		ts = np.array([sample['ts'] for sample in gp3_samples], dtype=float)
+
+		return [tuple(run) for run in \
+				self._detect_fixations_batch(gp3, pc, ts).tolist()]
+
+
+	def _detect_fixations_batch(self, gp3, pc, ts):
+
+		"""Vectorized I-VT fixation classification, see detect_fixations
+		(for internal use)
+
+		arguments
+		gp3		-- N x 3 array of gaze 3d positions
+		pc		-- N x 3 array of eye positions
+		ts		-- array of the N gaze 3d position timestamps, in
+				   microseconds
+
+		returns
+		runs	-- K x 2 array with the indices of the first and last sample
+				   of every fixation
+		"""
+
+		# vectors from eye to gaze 3d position, and the angle between every
+		# two consecutive ones (a.b = |a||b|cos(angle))
+		gaze = gp3 - pc
+		first = gaze[:-1]
+		last = gaze[1:]
+		cos_angle = np.einsum('ij,ij->i', first, last) / np.sqrt(
+			np.einsum('ij,ij->i', first, first) * 
+			np.einsum('ij,ij->i', last, last))
+		angle = np.degrees(np.arccos(np.clip(cos_angle, -1.0, 1.0)))
+		# degrees per second, like velocity_threshold
+		velocity = np.abs(angle / (np.diff(ts) / 1000000.0))
+
+		# runs of consecutive slow intervals; interval i lies between
+		# samples i and i+1, so a run of intervals [a, b) spans samples a
+		# up to and including b
+		slow = (velocity < self.velocity_threshold).astype(np.int8)
+		edges = np.flatnonzero(np.diff(np.concatenate(([0], slow, [0]))))
+		return edges.reshape(-1, 2)
+
 
 	def wait_for_saccade_start(self):
 
@@ -1314,50 +1545,89 @@ class TobiiGlassesTracker(BaseEyeTracker):
 		# # # # #
 		# PyGaze method
 
-		# get starting position (no blinks)
-			newpos = self.sample()
-			while not self.is_valid_sample(newpos, 'gp'):
-				newpos = self.sample()
-			# get starting time, position, intersampledistance, and velocity
-			t0 = clock.get_time()
-			prevpos = newpos
-			s = 0
-			v0 = 0
+		stime, spos, sts = self._wait_for_saccade_start()
+		return stime, spos
 
-			# get samples
-			saccadic = False
-			while not saccadic:
-				# get new sample
-				newpos = self.sample()
-				t1 = clock.get_time()
-				if self.is_valid_sample(newpos, 'gp') and \
-					newpos['gp'] != prevpos['gp']:
-					# check if distance is larger than precision error
-					sx = newpos['gp'][0] - prevpos['gp'][0]
-					sy = newpos['gp'][1] - prevpos['gp'][1]
-					# weigthed distance: (sx/tx)**2 + (sy/ty)**2 > 1 means
-					# movement larger than RMS noise
-					if (sx/self.pxdsttresh[0])**2 + (sy/self.pxdsttresh[1])**2 \
-						> self.weightdist:
-						# calculate distance
-						# intersampledistance = speed in pixels/ms
-						s = ((sx)**2 + (sy)**2)**0.5
-						# calculate velocity
-						v1 = s / (t1-t0)
-						# calculate acceleration
-						a = (v1-v0) / (t1-t0) # acceleration in pixels/ms**2
-						# check if either velocity or acceleration are above
-						# threshold values
-						if v1 > self.pxspdtresh or a > self.pxacctresh:
-							saccadic = True
-							spos = prevpos['gp'][:]
-							stime = clock.get_time()
-						# update previous values
-						t0 = copy.copy(t1)
-						v0 = copy.copy(v1)
-					# udate previous sample
-					prevpos = newpos
-			return stime, spos
+	def _wait_for_saccade_start(self):
+
+		"""Waits for a saccade to start, like wait_for_saccade_start, and
+		also returns the device timestamp of its starting sample (for
+		internal use)
+
+		Velocity and acceleration are computed over the samples' own
+		timestamps, so they are not affected by polling jitter or by drift
+		between the host and the glasses' clock.
+
+		arguments
+		None
+
+		returns
+		stime, spos, sts	-- starting time in milliseconds (from
+						   expbegintime), (x,y) gaze position and
+						   device timestamp in milliseconds
+
+		"""
+
+		# local aliases, save attribute lookups per sample
+		get_data = self.get_data
+		sample_from = self._sample_from
+		is_valid = self.is_valid_sample
+		hypot = math.hypot
+		# gaze positions are normalized, the thresholds are in pixels
+		dispw, disph = self.dispsize
+		inv_pxdst0, inv_pxdst1 = self.pxdsttresh_inv
+		weightdist = self.weightdist
+		pxspdtresh = self.pxspdtresh
+		pxacctresh = self.pxacctresh
+
+		# get starting position (no blinks)
+		newpos = sample_from(get_data())
+		while not is_valid(newpos, 'gp'):
+			newpos = sample_from(get_data())
+		# get starting time, position, intersampledistance, and velocity
+		# (device timestamps are in microseconds)
+		t0 = newpos['ts'] / 1000.0
+		prevpos = newpos
+		s = 0
+		v0 = 0
+
+		# get samples
+		saccadic = False
+		while not saccadic:
+			# get new sample
+			newpos = sample_from(get_data())
+			if is_valid(newpos, 'gp') and \
+				newpos['gp'] != prevpos['gp']:
+				t1 = newpos['ts'] / 1000.0
+				# check if distance is larger than precision error
+				sx = (newpos['gp'][0] - prevpos['gp'][0]) * dispw
+				sy = (newpos['gp'][1] - prevpos['gp'][1]) * disph
+				# weigthed distance: (sx/tx)**2 + (sy/ty)**2 > 1 means
+				# movement larger than RMS noise
+				wx = sx * inv_pxdst0
+				wy = sy * inv_pxdst1
+				if wx*wx + wy*wy > weightdist:
+					# calculate distance
+					# intersampledistance = speed in pixels/ms
+					s = hypot(sx, sy)
+					# calculate velocity
+					inv_dt = 1.0 / (t1-t0)
+					v1 = s * inv_dt
+					# calculate acceleration
+					a = (v1-v0) * inv_dt # acceleration in pixels/ms**2
+					# check if either velocity or acceleration are above
+					# threshold values
+					if v1 > pxspdtresh or a > pxacctresh:
+						saccadic = True
+						spos = tuple(prevpos['gp'])
+						sts = prevpos['ts'] / 1000.0
+						stime = clock.get_time()
+					# update previous values
+					t0 = t1
+					v0 = v1
+				# udate previous sample
+				prevpos = newpos
+		return stime, spos, sts
 
 	def wait_for_saccade_end(self):
 
@@ -1390,44 +1660,57 @@ class TobiiGlassesTracker(BaseEyeTracker):
 		# # # # #
 		# PyGaze method
 		
+		# local aliases, save attribute lookups per sample
+		get_data = self.get_data
+		sample_from = self._sample_from
+		is_valid = self.is_valid_sample
+		hypot = math.hypot
+		# gaze positions are normalized, the thresholds are in pixels
+		dispw, disph = self.dispsize
+		pxspdtresh = self.pxspdtresh
+		pxacctresh = self.pxacctresh
+
 		# get starting position (no blinks)
-		t0, spos = self.wait_for_saccade_start()
-		# get valid sample
-		prevpos = self.sample()
-		while not self.is_valid_sample(prevpos, 'gp'):
-			prevpos = self.sample()
+		stime, spos, t0 = self._wait_for_saccade_start()
+		# get valid sample that is newer than the starting sample
+		prevpos = sample_from(get_data())
+		while not is_valid(prevpos, 'gp') or \
+			prevpos['ts'] / 1000.0 <= t0:
+			prevpos = sample_from(get_data())
 		# get starting time, intersample distance, and velocity
-		t1 = clock.get_time()
+		# (device timestamps are in microseconds)
+		t1 = prevpos['ts'] / 1000.0
 		# = intersample distance = speed in px/sample
-		s = ((prevpos['gp'][0] - spos['gp'][0])**2 + \
-			(prevpos['gp'][1] - spos['gp'][1])**2)**0.5 
+		s = hypot((prevpos['gp'][0] - spos[0]) * dispw,
+			(prevpos['gp'][1] - spos[1]) * disph)
 		v0 = s / (t1-t0)
 
 		# run until velocity and acceleration go below threshold
 		saccadic = True
 		while saccadic:
 			# get new sample
-			newpos = self.sample()
-			t1 = clock.get_time()
-			if self.is_valid_sample(newpos,'gp') and \
+			newpos = sample_from(get_data())
+			if is_valid(newpos,'gp') and \
 				newpos['gp'] != prevpos['gp']:
+				t1 = newpos['ts'] / 1000.0
 				# calculate distance
 				# speed in pixels/sample
-				s = ((newpos['gp'][0]-prevpos['gp'][0])**2 + \
-					(newpos['gp'][1]-prevpos['gp'][1])**2)**0.5 
+				s = hypot((newpos['gp'][0]-prevpos['gp'][0]) * dispw,
+					(newpos['gp'][1]-prevpos['gp'][1]) * disph)
 				# calculate velocity
-				v1 = s / (t1-t0)
+				inv_dt = 1.0 / (t1-t0)
+				v1 = s * inv_dt
 				# calculate acceleration
 				# acceleration in pixels/sample**2 
-				a = (v1-v0) / (t1-t0) 
+				a = (v1-v0) * inv_dt
 				# check if velocity and acceleration are below threshold
-				if v1 < self.pxspdtresh and (a > -1*self.pxacctresh and a < 0):
+				if v1 < pxspdtresh and (a > -1*pxacctresh and a < 0):
 					saccadic = False
-					epos = newpos['gp'][:]
+					epos = tuple(newpos['gp'])
 					etime = clock.get_time()
 				# update previous values
-				t0 = copy.copy(t1)
-				v0 = copy.copy(v1)
+				t0 = t1
+				v0 = v1
 			# udate previous sample
 			prevpos = newpos
 
@@ -1448,21 +1731,189 @@ class TobiiGlassesTracker(BaseEyeTracker):
 					    an invalid sample
 
 		"""
-		if sample_type == 'gp3':
-			if sample['gp3'] == [-1,-1,-1]:
-				return False
-		elif sample_type == 'gp':
-			if sample['gp'] == [-1,-1]:
-				return False
-		elif sample_type == 'pc':
-			if sample['pc'] == [-1,-1,-1]:
-				return False
-		else:
+		invalid = _INVALID_SAMPLES.get(sample_type)
+		if invalid is None:
 			# supplied sample type not supported. log error.
 			log.error("The supplied sample type {} is not supported.".format(sample_type))
+			return True
 
-		# in any other case, the sample is valid
-		return True
+		# the sample is valid unless it holds the invalid sentinel value
+		return sample[sample_type] != invalid
+
+
+	def _all_valid(self, gaze_sample, gp3_sample, eye_sample):
+
+		"""Checks if a gaze position, gaze 3d position and eye position
+		sample are all valid; same criteria as is_valid_sample, in a single
+		call (for internal use)
+
+		arguments
+		gaze_sample	-- a gaze position sample
+		gp3_sample		-- a gaze 3d position sample
+		eye_sample		-- an eye position sample
+
+		returns
+		valid		--	a Boolean: True if all samples are valid, False if
+					    any of them is invalid
+		"""
+
+		return gaze_sample['gp'] != _INVALID_SAMPLES['gp'] and \
+			gp3_sample['gp3'] != _INVALID_SAMPLES['gp3'] and \
+			eye_sample['pc'] != _INVALID_SAMPLES['pc']
+
+
+	def _fetch_valid_triple(self):
+
+		"""Fetches a gaze position, gaze 3d position and eye position
+		sample, retrying until all three are valid (for internal use)
+
+		arguments
+		None
+
+		returns
+		samples		-- a (gaze_pos, gp3, eye_position) tuple of sample
+					   dictionaries
+		"""
+
+		snapshot = self._snapshot
+		sample_from = self._sample_from
+		sample3D_from = self._sample3D_from
+		eye_position_from = self._eye_position_from
+		all_valid = self._all_valid
+
+		# retry fetching samples until all three are valid; all three are
+		# read from one snapshot of the livedata
+		while True:
+			data = snapshot()
+			gaze_pos = sample_from(data)
+			spos = sample3D_from(data)
+			eye_position = eye_position_from(data)
+			if all_valid(gaze_pos, spos, eye_position):
+				return gaze_pos, spos, eye_position
+
+
+	def _reset_fixation_window(self):
+
+		"""Allocates an empty fixation sample window of
+		num_fixation_samples samples (for internal use)
+
+		The window is stored as ring buffers with one row per sample; once
+		the window is full, a new sample overwrites the oldest one in place.
+
+		arguments
+		None
+
+		returns
+		Nothing	-- sets the ring buffers and counters of the window
+		"""
+
+		nsamples = self.num_fixation_samples
+		if nsamples < 2:
+			# the angular velocity needs a first and a last sample
+			raise Exception("Error in libtobiiglasses.TobiiGlassesTracker: num_fixation_samples should be at least 2, not %s" % nsamples)
+		# positions keep double precision, so the medians returned from
+		# the window are the values the glasses sent
+		self._gp_ring = np.full((nsamples, 2), np.nan)		# gaze positions
+		self._gp3_ring = np.full((nsamples, 3), np.nan)	# 3d gaze positions
+		self._pc_ring = np.full((nsamples, 3), np.nan)		# 3d eye positions
+		# timestamps and event ids, one row per stream (gp, gp3, pc), so
+		# the values of each stream are contiguous
+		self._ts_ring = np.zeros((3, nsamples), dtype=np.int64)
+		self._gidx_ring = np.full((3, nsamples), -1, dtype=np.int32)
+		self._head = 0			# row the next sample is written to
+		self._nsamples = 0		# number of samples in the window
+
+
+	def _pump_samples(self):
+
+		"""Fetches valid samples and writes them to the fixation sample
+		window; once the window is full, the oldest sample is overwritten
+		(for internal use)
+
+		arguments
+		None
+
+		returns
+		samples		-- the fetched (gaze_pos, gp3, eye_position) tuple of
+					   sample dictionaries
+		"""
+
+		# the livedata is polled much faster than the glasses send frames;
+		# a frame that is already in the window would add a sample without
+		# any time passing, so wait for the next one
+		fetch_valid_triple = self._fetch_valid_triple
+		row = self._head
+		if self._nsamples:
+			last_ts = int(self._ts_ring[1, row - 1])
+		else:
+			last_ts = None
+		while True:
+			gaze_pos, spos, eye_position = fetch_valid_triple()
+			if spos['ts'] != last_ts:
+				break
+
+
+		self._gp_ring[row] = gaze_pos['gp']
+		self._gp3_ring[row] = spos['gp3']
+		self._pc_ring[row] = eye_position['pc']
+		self._ts_ring[:, row] = (gaze_pos['ts'], spos['ts'], eye_position['ts'])
+		self._gidx_ring[:, row] = (gaze_pos['gidx'], spos['gidx'], 
+							eye_position['gidx'])
+
+		nrows = len(self._gp_ring)
+		self._head = (row + 1) % nrows
+		if self._nsamples < nrows:
+			self._nsamples += 1
+
+		return gaze_pos, spos, eye_position
+
+
+	def _window_row(self, i):
+
+		"""Returns the ring buffer row of the i-th oldest sample in a full
+		fixation sample window (for internal use)"""
+
+		return (self._head + i) % len(self._gp_ring)
+
+
+	def _window_angular_velocity(self):
+
+		"""Returns the angular velocity between the oldest and newest sample
+		in the (full) fixation sample window, see calculate_angular_velocity
+		(for internal use)"""
+
+		first = self._head
+		last = first - 1	# wraps around to the last row
+
+		gp3_first = self._gp3_ring[first].tolist()
+		gp3_last = self._gp3_ring[last].tolist()
+		pc_first = self._pc_ring[first].tolist()
+		pc_last = self._pc_ring[last].tolist()
+
+		return _angular_velocity(
+			gp3_first[0] - pc_first[0],
+			gp3_first[1] - pc_first[1],
+			gp3_first[2] - pc_first[2],
+			gp3_last[0] - pc_last[0],
+			gp3_last[1] - pc_last[1],
+			gp3_last[2] - pc_last[2],
+			gp3_last[0] - gp3_first[0],
+			gp3_last[1] - gp3_first[1],
+			gp3_last[2] - gp3_first[2],
+			int(self._ts_ring[1, last] - self._ts_ring[1, first]) / 1000000.0)
+
+
+	def _window_same_event(self):
+
+		"""Checks that all samples in the fixation sample window are from
+		the same gaze event, see is_same_event (for internal use)
+
+		All streams are compared against the gaze 3d position gidx values
+		in a single pass over the window.
+		"""
+
+		gidx_ring = self._gidx_ring
+		return bool((gidx_ring == gidx_ring[1]).all())
 
 
 	def is_same_event(self, gaze_samples, gp3_samples, eye_samples):
@@ -1485,9 +1936,12 @@ class TobiiGlassesTracker(BaseEyeTracker):
 		
 		"""
 		
-		valid = all(gaze['gidx'] == gp3['gidx'] == eye['gidx'] for \
-				gaze, gp3, eye in zip(gaze_samples, gp3_samples, eye_samples))
-		return valid
+		# stop at the first mismatch
+		for gaze, gp3, eye in zip(gaze_samples, gp3_samples, eye_samples):
+			gidx = gp3['gidx']
+			if gaze['gidx'] != gidx or eye['gidx'] != gidx:
+				return False
+		return True
 
 	def get_data(self):
 
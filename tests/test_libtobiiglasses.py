@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of PyGaze - the open-source toolbox for eye tracking
+#
+# PyGaze is a Python module for easily creating gaze contingent experiments
+# or other software (as well as non-gaze contingent experiments/software)
+# Copyright (C) 2012-2013 Edwin S. Dalmaijer
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+"""Tests for the Tobii Pro Glasses 2 tracker, run on stubbed livedata
+
+The glasses, the display, keyboard and sound are replaced by stand-ins, so
+the tests run without hardware or a display back-end.
+"""
+
+import logging
+import math
+import sys
+import types
+import unittest
+
+import numpy as np
+
+
+# # # # #
+# stand-ins for the hardware and the display back-ends
+
+class FakeClock(object):
+
+	"""Clock that advances one millisecond every time it is read"""
+
+	def __init__(self):
+
+		self.time = 0.0
+
+	def get_time(self):
+
+		self.time += 1.0
+		return self.time
+
+
+class OutOfFrames(Exception):
+
+	"""Raised when a test reads more livedata than it provided, so a
+	detection that never fires fails instead of hanging"""
+
+
+class FakeController(object):
+
+	"""Stand-in for TobiiGlassesController; every frame is served for
+	'repeat' reads of the livedata, as the tracker polls the livedata
+	much faster than the glasses update it"""
+
+	def __init__(self, udpport=None, address=None):
+
+		self.streaming = True
+		self.set_frames([empty_frame()])
+
+	def set_frames(self, frames, repeat=1):
+
+		self.frames = list(frames)
+		self.repeat = repeat
+		self.reads = 0
+
+	@property
+	def data(self):
+
+		i = self.reads // self.repeat
+		if i >= len(self.frames):
+			raise OutOfFrames("ran out of livedata frames")
+		self.reads += 1
+		return self.frames[i]
+
+	def is_streaming(self):
+
+		return self.streaming
+
+	def start_streaming(self):
+
+		self.streaming = True
+
+	def stop_streaming(self):
+
+		self.streaming = False
+
+
+def _stub(name, **attrs):
+
+	module = types.ModuleType(name)
+	module.__dict__.update(attrs)
+	sys.modules[name] = module
+	return module
+
+
+_stub('pygaze.libtime', clock=FakeClock())
+_stub('pygaze.screen', Screen=lambda *args, **kwargs: None)
+_stub('pygaze.keyboard', Keyboard=lambda *args, **kwargs: None)
+_stub('pygaze.sound', Sound=lambda *args, **kwargs: None)
+_stub('tobiiglasses')
+_stub('tobiiglasses.tobiiglassescontroller',
+	TobiiGlassesController=FakeController)
+try:
+	import urllib2
+except ImportError:
+	# Python 3; the module only needs urllib2 for the REST API
+	_stub('urllib2')
+if not hasattr(np, 'VisibleDeprecationWarning'):
+	# moved in NumPy 2
+	np.VisibleDeprecationWarning = np.exceptions.VisibleDeprecationWarning
+
+from pygaze._eyetracker.libtobiiglasses import TobiiGlassesTracker, \
+	calculate_angular_velocity
+
+
+# # # # #
+# livedata
+
+def empty_frame():
+
+	"""Returns livedata as it is before the glasses sent anything"""
+
+	missing = {'ts': -1}
+	return {'mems': {'ac': missing, 'gy': missing},
+		'gp': missing,
+		'gp3': missing,
+		'left_eye': {'pc': missing, 'pd': missing, 'gd': missing},
+		'right_eye': {'pc': missing, 'pd': missing, 'gd': missing}}
+
+
+def frame(i, gp, gp3=(0.0, 0.0, 500.0), pc=(0.0, 0.0, 0.0), rate=100):
+
+	"""Returns the livedata of the i-th gaze event of a recording at rate
+	Hz; timestamps are in microseconds"""
+
+	ts = int(i * 1000000 / rate)
+	def value(key, val):
+		return {'ts': ts, 'gidx': i, 's': 0, key: val}
+	def eye():
+		return {'pc': value('pc', list(pc)), 'pd': value('pd', 4.0),
+			'gd': value('gd', [0.0, 0.0, 1.0])}
+	return {'mems': {'ac': {'ts': ts, 'ac': [0.0, 0.0, 0.0]},
+			'gy': {'ts': ts, 'gy': [0.0, 0.0, 0.0]}},
+		'gp': {'ts': ts, 'gidx': i, 's': 0, 'l': ts, 'gp': list(gp)},
+		'gp3': value('gp3', list(gp3)),
+		'left_eye': eye(),
+		'right_eye': eye()}
+
+
+def gp3_at(angle):
+
+	"""Returns a gaze 3d position at angle degrees from straight ahead"""
+
+	rad = math.radians(angle)
+	return (500.0 * math.sin(rad), 0.0, 500.0 * math.cos(rad))
+
+
+class TobiiGlassesTrackerTest(unittest.TestCase):
+
+	def setUp(self):
+
+		self.tracker = TobiiGlassesTracker(None)
+		self.controller = self.tracker.tobiiglasses
+
+	def tearDown(self):
+
+		self.tracker.close()
+
+	def test_init(self):
+
+		tracker = self.tracker
+		dispsize = tracker.dispsize
+		screensize = tracker.screensize
+		pixpercm = (dispsize[0] / float(screensize[0]) + \
+			dispsize[1] / float(screensize[1])) / 2.0
+		self.assertAlmostEqual(tracker.pixpercm, pixpercm)
+		pxfixtresh = math.tan(math.radians(tracker.fixtresh)) * \
+			tracker.screendist * pixpercm
+		self.assertAlmostEqual(tracker.pxfixtresh, pxfixtresh)
+		self.assertAlmostEqual(tracker.pxfixtresh_sq, pxfixtresh**2)
+		self.assertGreater(tracker.pxspdtresh, 0)
+		self.assertGreater(tracker.pxacctresh, 0)
+		self.assertEqual(tracker.pxdsttresh_inv, (1.0 / tracker.pxdsttresh[0],
+			1.0 / tracker.pxdsttresh[1]))
+
+	def test_calculate_angular_velocity(self):
+
+		# 90 degrees in half a second
+		gp3_samples = [{'gp3': [0.0, 0.0, 500.0], 'ts': 0},
+			{'gp3': [500.0, 0.0, 0.0], 'ts': 500000}]
+		eye_samples = [{'pc': [0.0, 0.0, 0.0]}, {'pc': [0.0, 0.0, 0.0]}]
+		self.assertAlmostEqual(
+			calculate_angular_velocity(gp3_samples, eye_samples), 180.0)
+		# no time passed: no velocity
+		gp3_samples[1]['ts'] = 0
+		self.assertTrue(math.isnan(
+			calculate_angular_velocity(gp3_samples, eye_samples)))
+
+	def test_eye_position(self):
+
+		data = frame(1, (0.5, 0.5))
+		data['left_eye']['pc']['pc'] = [10.0, 0.0, 0.0]
+		data['right_eye']['pc']['pc'] = [-20.0, 2.0, 4.0]
+		tracker = self.tracker
+		tracker.eye_used = 0
+		self.assertEqual(tracker._eye_position_from(data)['pc'],
+			[10.0, 0.0, 0.0])
+		tracker.eye_used = 1
+		self.assertEqual(tracker._eye_position_from(data)['pc'],
+			[-20.0, 2.0, 4.0])
+		tracker.eye_used = 2
+		self.assertEqual(tracker._eye_position_from(data),
+			{'pc': [-5.0, 1.0, 2.0], 'ts': 10000, 'gidx': 1})
+		# eyes from different gaze events
+		data['right_eye']['pc']['gidx'] = 2
+		self.assertEqual(tracker._eye_position_from(data)['pc'], [-1,-1,-1])
+		# no data yet
+		self.assertEqual(tracker._eye_position_from(empty_frame())['pc'],
+			[-1,-1,-1])
+		# through the public getter
+		self.controller.set_frames([frame(1, (0.5, 0.5))])
+		self.assertEqual(tracker.eye_position()['pc'], [0.0, 0.0, 0.0])
+
+	def test_snapshot(self):
+
+		data = frame(1, (0.5, 0.5))
+		self.controller.set_frames([data])
+		snapshot = self.tracker._snapshot()
+		# the controller replaces the data of a stream as a new frame comes in
+		data['gp3'] = frame(2, (0.5, 0.5))['gp3']
+		data['left_eye']['pc'] = frame(2, (0.5, 0.5))['left_eye']['pc']
+		self.assertEqual(snapshot['gp3']['gidx'], 1)
+		self.assertEqual(snapshot['left_eye']['pc']['gidx'], 1)
+
+	def test_is_same_event(self):
+
+		frames = [frame(i, (0.5, 0.5)) for i in range(3)]
+		gaze_samples = [data['gp'] for data in frames]
+		gp3_samples = [data['gp3'] for data in frames]
+		eye_samples = [data['left_eye']['pc'] for data in frames]
+		self.assertTrue(self.tracker.is_same_event(gaze_samples,
+			gp3_samples, eye_samples))
+		eye_samples[1] = frames[2]['left_eye']['pc']
+		self.assertFalse(self.tracker.is_same_event(gaze_samples,
+			gp3_samples, eye_samples))
+
+	def test_fixation_end_on_gaze_jump(self):
+
+		# steady gaze, then jumps between opposite corners of the scene
+		frames = [frame(i, (0.5, 0.5)) for i in range(200)]
+		frames += [frame(i, (i % 2, i % 2)) for i in range(200, 210)]
+		self.controller.set_frames(frames)
+		data = self.tracker.wait_for_fixation_end()
+		self.assertEqual(data['gaze_pos']['gp'], [0.5, 0.5])
+
+	def test_waiting_for_data_does_not_log(self):
+
+		# the glasses have not sent anything for a while
+		frames = [empty_frame()] * 50
+		frames += [frame(i, (0.5, 0.5)) for i in range(1, 200)]
+		frames += [frame(i, (i % 2, i % 2)) for i in range(200, 210)]
+		self.controller.set_frames(frames)
+		errors = []
+		handler = logging.Handler(logging.ERROR)
+		handler.emit = errors.append
+		logging.getLogger().addHandler(handler)
+		try:
+			self.tracker.wait_for_fixation_end()
+		finally:
+			logging.getLogger().removeHandler(handler)
+		self.assertEqual(errors, [])
+
+	def test_saccade_start_on_gaze_jump(self):
+
+		frames = [frame(0, (0.5, 0.5))]
+		frames += [frame(i, (i % 2, i % 2)) for i in range(1, 10)]
+		self.controller.set_frames(frames)
+		stime, spos = self.tracker.wait_for_saccade_start()
+		self.assertEqual(spos, (0.5, 0.5))
+
+	def test_experimental_fixation_on_repeated_frames(self):
+
+		# every frame is read several times before the next one arrives
+		frames = [empty_frame()]
+		frames += [frame(i, (0.5, 0.5), gp3_at(0.1 * i)) for i in range(1, 20)]
+		self.controller.set_frames(frames, repeat=5)
+		data = self.tracker.wait_for_fixation_start(experimental=True)
+		self.assertEqual(data['gaze_pos'], [0.5, 0.5])
+		# the middle sample of the first full window
+		self.assertEqual(data['ts'], 20000)
+
+	def test_experimental_fixation_position(self):
+
+		frames = [frame(i, (0.25, 0.75), (10.1, -3.3, 500.1))
+			for i in range(1, 10)]
+		self.controller.set_frames(frames)
+		data = self.tracker.wait_for_fixation_start(experimental=True)
+		self.assertEqual(data['gaze_pos'], [0.25, 0.75])
+		self.assertEqual(data['gp3'], [10.1, -3.3])
+
+	def test_detect_fixations(self):
+
+		# 100 Hz recording: fixation, a 20 degree saccade at 500 degrees
+		# per second, fixation
+		angles = [0.0] * 20 + [5.0 * i for i in range(1, 5)] + [20.0] * 20
+		gp3_samples = []
+		eye_samples = []
+		for i, angle in enumerate(angles):
+			data = frame(i, (0.5, 0.5), gp3_at(angle))
+			gp3_samples.append(data['gp3'])
+			eye_samples.append(data['left_eye']['pc'])
+		self.assertEqual(
+			self.tracker.detect_fixations(gp3_samples, eye_samples),
+			[(0, 19), (23, 43)])
+		self.assertEqual(self.tracker.detect_fixations([], []), [])
+		self.assertEqual(self.tracker.detect_fixations(gp3_samples[:1],
+			eye_samples[:1]), [])
+
+
+if __name__ == '__main__':
+
+	unittest.main()